@@ -1,13 +1,60 @@
 """推送器模块"""
 
 import asyncio
+import time
 from datetime import datetime
+from functools import lru_cache
 
 from astrbot.api import logger
+from astrbot.api.event import MessageChain
+from astrbot.api.message_components import Image
 
+from ..utils.content_processor import ContentProcessor, ContentProcessorFactory
+from ..utils.formatter import MessageFormatter
 from .subscription import Subscription, Target
 
 
+@lru_cache(maxsize=128)
+def _get_formatter(template: str) -> MessageFormatter:
+    """按模板缓存格式化器，同一订阅的条目复用同一实例"""
+    return MessageFormatter(template)
+
+
+class TargetUnavailableError(Exception):
+    """目标会话或平台不可用（不可恢复，本次推送中不再重试该目标）"""
+
+
+class TokenBucket:
+    """异步令牌桶限流器"""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        """初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 令牌桶容量（允许的突发数量）
+        """
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """获取一个令牌，令牌不足时等待补充"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
 class Pusher:
     """内容推送器"""
 
@@ -24,6 +71,27 @@ class Pusher:
                 },
             }
         )
+        # 配置在推送器生命周期内不变，预先取出常用项
+        self._push_cfg = self.config.get("push", {})
+        self._default_template = self.config.get("template", {}).get("default")
+        # 全局限速：所有订阅的推送共享同一个令牌桶（订阅是并发检查的）
+        batch_interval = self._push_cfg.get("batch_interval", 3)
+        self._rate_limiter = (
+            TokenBucket(1 / batch_interval, self._push_cfg.get("concurrent_items", 3))
+            if batch_interval > 0
+            else None
+        )
+        self._processor_factory = ContentProcessorFactory()
+        # 按订阅URL缓存内容处理器
+        self._processors: dict[str, ContentProcessor] = {}
+
+    def _get_processor(self, url: str) -> ContentProcessor:
+        """获取订阅URL对应的内容处理器（带缓存）"""
+        processor = self._processors.get(url)
+        if processor is None:
+            processor = self._processor_factory.get_processor(url)
+            self._processors[url] = processor
+        return processor
 
     async def push(self, sub: Subscription, items: list[dict]):
         """推送内容到目标（支持并发推送）
@@ -36,99 +104,148 @@ class Pusher:
             return
 
         # 获取配置
-        push_config = self.config.get("push", {})
+        push_config = self._push_cfg
         batch_interval = push_config.get("batch_interval", 3)
-        max_images = push_config.get("max_images_per_push", 1)
+        # 负数视为 0，切片 [:0] 即不推送图片
+        max_images = max(0, push_config.get("max_images_per_push", 1))
         # 并发配置：同时推送的条目数，默认3个
         concurrent_items = push_config.get("concurrent_items", 3)
         # 每个条目的目标并发数，默认5个
         concurrent_targets = push_config.get("concurrent_targets", 5)
+        # 单个目标发送超时（秒）
+        send_timeout = push_config.get("send_timeout", 30)
         
+        # 使用惰性格式化，日志级别关闭时不构造字符串
         logger.info(
-            f"📊 推送配置: 条目数={len(items)}, "
-            f"并发条目数={concurrent_items}, "
-            f"并发目标数={concurrent_targets}, "
-            f"批量间隔={batch_interval}秒, "
-            f"最大图片数={max_images}"
+            "📊 推送配置: 条目数=%d, 并发条目数=%s, 并发目标数=%s, 批量间隔=%s秒, 最大图片数=%s",
+            len(items),
+            concurrent_items,
+            concurrent_targets,
+            batch_interval,
+            max_images,
         )
 
-        # 使用信号量控制并发数
-        items_semaphore = asyncio.Semaphore(concurrent_items)
-        targets_semaphore = asyncio.Semaphore(concurrent_targets)
+        # 每个条目只格式化一次，再将 (条目, 目标) 对放入同一个工作队列
+        chains: list[MessageChain | None] = []
+        # 同一次推送中 GUID 相同的条目复用已渲染的消息链
+        rendered: dict[str, MessageChain] = {}
+        processor = self._get_processor(sub.url)
+        for index, item in enumerate(items):
+            guid = item.get("guid")
+            if guid and guid in rendered:
+                chains.append(rendered[guid])
+                continue
+
+            try:
+                message = self._format_message(sub, item, processor)
+            except Exception as e:
+                logger.error("❌ 推送条目[%d]失败: %s - %s", index + 1, sub.name, e)
+                chains.append(None)
+                continue
+
+            # 提取图片URL
+            images = item.get("images", [])[:max_images]
+            # 消息链每个条目只构建一次，所有目标共享
+            chain = self._build_chain(message, images)
+            chains.append(chain)
+            if guid:
+                rendered[guid] = chain
+
+        pair_count = sum(len(sub.targets) for chain in chains if chain is not None)
+        if pair_count == 0:
+            return
+
+        # 按批量间隔限速放行条目（避免API限流），已放行的条目并发发送
+        bucket = self._rate_limiter
+        queue: asyncio.Queue = asyncio.Queue()
+
+        results: list[list] = [[] for _ in items]
+        remaining = [len(sub.targets)] * len(items)
+        # 出现不可恢复错误的目标，本次推送的后续条目直接跳过
+        dead_targets: set[str] = set()
 
-        async def push_single_item(item: dict, index: int):
-            """推送单个条目"""
-            async with items_semaphore:
+        def finish_item(index: int):
+            """条目的所有目标发送完毕后汇总结果"""
+            item = items[index]
+            # 统计是否有成功（单次遍历）
+            failed_count = 0
+            for r in results[index]:
+                if isinstance(r, BaseException):
+                    failed_count += 1
+            success_count = len(results[index]) - failed_count
+
+            if success_count == 0:
+                logger.error("❌ 推送条目[%d]失败: %s - 所有目标推送失败", index + 1, sub.name)
+            else:
+                logger.info(
+                    "✅ 条目[%d]推送完成: %s... (%d成功)",
+                    index + 1,
+                    item.get("title", "")[:30],
+                    success_count,
+                )
+
+        async def worker():
+            """从队列中取出 (条目, 目标) 对并发送"""
+            while True:
+                index, target = await queue.get()
                 try:
-                    message = self._format_message(sub, item)
-
-                    # 提取图片URL
-                    all_images = item.get("images", [])
-                    images = all_images[:max_images] if max_images > 0 else []
-
-                    # 并发推送到所有目标
-                    target_tasks = []
-                    for target in sub.targets:
-                        target_tasks.append(
-                            self._send_to_target_with_semaphore(
-                                target, message, images, targets_semaphore
+                    if target.id in dead_targets:
+                        results[index].append(TargetUnavailableError(target.id))
+                    else:
+                        try:
+                            await asyncio.wait_for(
+                                self._send_to_target(target, chains[index]),
+                                timeout=send_timeout,
                             )
-                        )
-
-                    # 等待所有目标推送完成
-                    results = await asyncio.gather(*target_tasks, return_exceptions=True)
-                    
-                    # 统计是否有成功
-                    failed_count = sum(1 for r in results if isinstance(r, Exception))
-                    success_count = len(results) - failed_count
-
-                    if success_count == 0 and len(results) > 0:
-                        raise Exception("所有目标推送失败")
-
-                    logger.info(f"✅ 条目[{index+1}]推送完成: {item['title'][:30]}... ({success_count}成功)")
-
-                    # 如果不是最后一个条目，添加间隔（避免API限流）
-                    if index < len(items) - 1:
-                        await asyncio.sleep(batch_interval)
-
-                except Exception as e:
-                    logger.error(f"❌ 推送条目[{index+1}]失败: {sub.name} - {e}")
-                    raise
-
-        # 并发推送所有条目
-        tasks = [push_single_item(item, i) for i, item in enumerate(items)]
-        await asyncio.gather(*tasks, return_exceptions=True)
-
-    async def _send_to_target_with_semaphore(
-        self,
-        target: Target,
-        message: str,
-        images: list[str],
-        semaphore: asyncio.Semaphore,
-    ):
-        """带信号量控制的发送消息到目标"""
-        async with semaphore:
-            return await self._send_to_target(target, message, images)
-
-    def _format_message(self, sub: Subscription, item: dict) -> str:
+                            results[index].append(True)
+                        except TargetUnavailableError as e:
+                            dead_targets.add(target.id)
+                            results[index].append(e)
+                        except Exception as e:
+                            results[index].append(e)
+
+                    remaining[index] -= 1
+                    if remaining[index] == 0:
+                        finish_item(index)
+                finally:
+                    queue.task_done()
+
+        # 固定数量的工作协程，替代条目/目标两级信号量
+        worker_count = min(max(concurrent_items, concurrent_targets), pair_count)
+        workers = [asyncio.create_task(worker()) for _ in range(worker_count)]
+        try:
+            for index, chain in enumerate(chains):
+                if chain is None:
+                    continue
+                if bucket:
+                    await bucket.acquire()
+                for target in sub.targets:
+                    queue.put_nowait((index, target))
+            await queue.join()
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def _format_message(
+        self, sub: Subscription, item: dict, processor: ContentProcessor | None = None
+    ) -> str:
         """格式化消息"""
-        from ..utils.content_processor import ContentProcessorFactory
-        
-        factory = ContentProcessorFactory()
-        processor = factory.get_processor(sub.url)
+        if processor is None:
+            processor = self._get_processor(sub.url)
         processed = processor.process(item, self.config)
+
+        # 发布时间每个条目只格式化一次，模板与内置格式共用
+        pub_date_str = ""
+        if item.get("pubDate") and isinstance(item["pubDate"], datetime):
+            pub_date_str = item["pubDate"].strftime("%Y-%m-%d %H:%M")
         
         template = sub.template
         if not template:
-            template = self.config.get("template", {}).get("default")
+            template = self._default_template
         
         if template:
             try:
-                from ..utils.formatter import MessageFormatter
-                pub_date_str = ""
-                if item.get("pubDate") and isinstance(item["pubDate"], datetime):
-                    pub_date_str = item["pubDate"].strftime("%Y-%m-%d %H:%M")
-                
                 template_item = {
                     "title": item.get("title", "").strip(),
                     "display_title": processed.get("display_title", ""),
@@ -141,61 +258,70 @@ class Pusher:
                     "pubDate": pub_date_str,
                     "guid": item.get("guid", ""),
                 }
-                return MessageFormatter(template).format(sub.name, template_item)
+                return _get_formatter(template).format(sub.name, template_item)
             except Exception as e:
-                logger.warning(f"模板格式化失败: {e}，将使用内置格式")
+                logger.warning("模板格式化失败: %s，将使用内置格式", e)
         
-        return self._format_message_builtin(sub, item, processed)
+        return self._format_message_builtin(sub, item, processed, pub_date_str)
     
-    def _format_message_builtin(self, sub: Subscription, item: dict, processed: dict) -> str:
+    def _format_message_builtin(
+        self, sub: Subscription, item: dict, processed: dict, pub_date_str: str = ""
+    ) -> str:
         """内置简化格式"""
-        title = item.get("title", "").strip()
-        link = item.get("link", "").strip()
-        author = item.get("author", "").strip()
-        pub_date_str = ""
-        if item.get("pubDate") and isinstance(item["pubDate"], datetime):
-            pub_date_str = item["pubDate"].strftime("%Y-%m-%d %H:%M")
+        get = item.get
+        link = get("link", "").strip()
+        author = get("author", "").strip()
+
+        get = processed.get
+        clean_desc = get("clean_description", "")
+        video_url = get("video_url", "")
+        extra_links = get("extra_links", {})
+        opus_url = extra_links.get('opus')
+
+        # 常见情况：字段齐全且无额外链接，直接一次性拼接
+        if clean_desc and pub_date_str and author and link and not video_url and not opus_url:
+            return (
+                f"【{sub.name}】\n\n📝 {clean_desc}\n\n"
+                f"⏱️ {pub_date_str} | 👤 {author}\n🔗 地址：{link}"
+            )
 
-        clean_desc = processed.get("clean_description", "")
-        video_url = processed.get("video_url", "")
-        extra_links = processed.get("extra_links", {})
-        
         msg_parts = [f"【{sub.name}】"]
         if clean_desc:
             msg_parts.append(f"\n📝 {clean_desc}")
         if video_url:
             msg_parts.append(f"\n🎬 视频：{video_url}")
-        if extra_links.get('opus'):
-            msg_parts.append(f"📄 图文：{extra_links['opus']}")
+        if opus_url:
+            msg_parts.append(f"📄 图文：{opus_url}")
         
-        if pub_date_str or author:
-            meta = []
-            if pub_date_str: meta.append(f"⏱️ {pub_date_str}")
-            if author: meta.append(f"👤 {author}")
-            msg_parts.append("\n" + " | ".join(meta))
+        if pub_date_str and author:
+            msg_parts.append(f"\n⏱️ {pub_date_str} | 👤 {author}")
+        elif pub_date_str:
+            msg_parts.append(f"\n⏱️ {pub_date_str}")
+        elif author:
+            msg_parts.append(f"\n👤 {author}")
         
         if link:
             msg_parts.append(f"🔗 地址：{link}")
         
         return "\n".join(msg_parts).strip()
 
-    async def _send_to_target(self, target: Target, message: str, images: list[str] = []):
+    def _build_chain(self, message: str, images: list[str]) -> MessageChain:
+        """构建消息链（文本 + 图片）"""
+        message_chain = MessageChain().message(message)
+        if images:
+            for img_url in images:
+                try:
+                    message_chain.chain.append(Image.fromURL(img_url))
+                except: pass
+        return message_chain
+
+    async def _send_to_target(self, target: Target, message_chain: MessageChain):
         """发送消息到远端"""
         try:
-            from astrbot.api.event import MessageChain
-            from astrbot.api.message_components import Image
-
-            message_chain = MessageChain().message(message)
-            if images:
-                for img_url in images:
-                    try:
-                        message_chain.chain.append(Image.fromURL(img_url))
-                    except: pass
-
             session_str = target.id
             success = await self.context.send_message(session_str, message_chain)
             if not success:
-                raise Exception("未找到匹配的会话或平台")
+                raise TargetUnavailableError("未找到匹配的会话或平台")
         except Exception as e:
-            logger.error(f"❌ 发送失败: {e}")
+            logger.error("❌ 发送失败: %s", e)
             raise
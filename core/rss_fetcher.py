@@ -1,10 +1,57 @@
 """RSS获取器模块"""
 
+import asyncio
+import hashlib
+import os
+import pickle
+from collections.abc import Callable
+from typing import Any
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 import aiohttp
 import feedparser
 
 from astrbot.api import logger
 
+# 安装了 brotli 时 aiohttp 才能解码 br 压缩
+try:
+    import brotli  # noqa: F401
+
+    _ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    _ACCEPT_ENCODING = "gzip, deflate"
+
+_USER_AGENT = "astrbot-plugin-rsspush/2.0 (+https://github.com/Soulter/astrbot-plugin-rsspush)"
+
+# 条件请求返回 304 时的标记，表示 feed 自上次获取以来未变化
+NOT_MODIFIED = object()
+
+
+def _warmup():
+    """预热 feedparser（首次解析会初始化内部正则等结构，提前付出这部分开销）"""
+    feedparser.parse(b'<rss version="2.0"><channel></channel></rss>')
+
+
+def _parse_feed(content, content_type: str = "", transform: Callable | None = None, transform_args: tuple = ()):
+    """解析feed（在进程池中运行）
+
+    传入响应的 Content-Type，使仅在 HTTP 头中声明的编码（如 GBK）也能正确识别。
+    提供 transform 时在同一个工作进程中继续处理解析结果，只把处理后的结果传回主进程。
+
+    Returns:
+        (解析结果或 transform 的返回值, 解析警告文本)
+    """
+    feed = feedparser.parse(content, response_headers={"content-type": content_type})
+    exc = feed.get("bozo_exception")
+    warning = str(exc) if feed.get("bozo") and exc is not None else None
+    if transform is not None:
+        return transform(feed, *transform_args), warning
+    if exc is not None:
+        # 解析异常可能引用已关闭的文件对象而无法跨进程传递，这里转换为普通异常
+        feed["bozo_exception"] = Exception(str(exc))
+    return feed, warning
+
 
 class RSSFetcher:
     """RSS内容获取器"""
@@ -12,71 +59,187 @@ class RSSFetcher:
     def __init__(self, timeout: int = 30):
         self.timeout = aiohttp.ClientTimeout(total=timeout)
         self.session: aiohttp.ClientSession | None = None
-
-    async def fetch(self, url: str) -> dict | None:
+        # feed 解析是纯 Python 的 CPU 密集任务，放到进程池中绕开 GIL
+        self._parse_pool: ProcessPoolExecutor | None = None
+        self._parse_pool_failed = False
+        # 每个订阅最近一次响应的 (ETag, Last-Modified)，用于条件请求
+        # 按订阅而非URL记录：手动获取（添加/测试订阅）不能影响定时轮询的判断
+        self._cache: dict[str, tuple[str | None, str | None]] = {}
+        # 每个订阅最近一次响应体的摘要，服务器忽略条件请求时用于跳过重复解析
+        self._body_hashes: dict[str, bytes] = {}
+        # 主进程中的线程池回退路径同样受益于预热
+        _warmup()
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """获取共享会话（带连接池上限，复用TCP/TLS连接和DNS缓存）"""
+        if not self.session or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=50,
+                limit_per_host=4,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+            )
+            self.session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=connector,
+                headers={"Accept-Encoding": _ACCEPT_ENCODING, "User-Agent": _USER_AGENT},
+            )
+        return self.session
+
+    def get_validators(self, cache_key: str) -> tuple[str | None, str | None]:
+        """获取订阅最近一次响应的 (ETag, Last-Modified)"""
+        return self._cache.get(cache_key, (None, None))
+
+    def set_validators(self, cache_key: str, etag: str | None, last_modified: str | None):
+        """设置订阅的条件请求校验值（例如从持久化的订阅中恢复）"""
+        if etag or last_modified:
+            self._cache[cache_key] = (etag, last_modified)
+        else:
+            self._cache.pop(cache_key, None)
+
+    def invalidate(self, cache_key: str):
+        """清除订阅的校验值和响应摘要，下次获取时强制完整解析"""
+        self._cache.pop(cache_key, None)
+        self._body_hashes.pop(cache_key, None)
+
+    async def _parse(self, *args):
+        """在进程池中运行 _parse_feed，进程池不可用时退回默认线程池
+
+        只有进程池本身不可用（无法创建、工作进程崩溃、参数或结果无法跨进程传递）时才退回，
+        解析过程中抛出的普通异常照常向上传递
+        """
+        loop = asyncio.get_running_loop()
+        if not self._parse_pool_failed:
+            try:
+                if self._parse_pool is None:
+                    self._parse_pool = ProcessPoolExecutor(
+                        max_workers=min(4, os.cpu_count() or 1),
+                        initializer=_warmup,
+                    )
+                return await loop.run_in_executor(self._parse_pool, _parse_feed, *args)
+            except (OSError, NotImplementedError, BrokenProcessPool, pickle.PicklingError) as e:
+                logger.warning("进程池解析RSS失败，改用线程池: %s", e)
+                self._parse_pool_failed = True
+                self._shutdown_parse_pool()
+        return await loop.run_in_executor(None, _parse_feed, *args)
+
+    def _shutdown_parse_pool(self):
+        """关闭解析进程池"""
+        if self._parse_pool:
+            self._parse_pool.shutdown(wait=False, cancel_futures=True)
+            self._parse_pool = None
+
+    async def fetch(
+        self,
+        url: str,
+        cache_key: str | None = None,
+        transform: Callable | None = None,
+        transform_args: tuple = (),
+    ) -> Any:
         """异步获取RSS内容
 
         Args:
             url: RSS地址
+            cache_key: 条件请求状态的键（通常为订阅ID）；为 None 时发送普通请求，
+                且不读取、不更新任何条件请求状态
+            transform: 可选的模块级函数 transform(feed, *transform_args)，与 feed 解析在
+                同一个工作进程中执行，返回值代替 feed 数据返回
+            transform_args: transform 的额外参数
 
         Returns:
-            解析后的feed数据，失败返回None
+            解析后的feed数据（或 transform 的返回值）；条件请求且内容未变化时返回
+            NOT_MODIFIED；失败返回None
         """
-        if not self.session:
-            self.session = aiohttp.ClientSession(timeout=self.timeout)
+        session = self.get_session()
+
+        headers = {}
+        if cache_key is not None and cache_key in self._cache:
+            etag, last_modified = self._cache[cache_key]
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
 
         try:
-            async with self.session.get(url) as response:
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304 and headers:
+                    logger.debug("RSS未更新 %s", url)
+                    return NOT_MODIFIED
                 if response.status == 200:
-                    content = await response.text()
-                    
-                    # 在线程池中运行解析，避免阻塞事件循环
-                    import asyncio
-                    loop = asyncio.get_event_loop()
-                    feed = await loop.run_in_executor(None, feedparser.parse, content)
+                    # 原始字节连同 Content-Type 交给 feedparser，由其按 HTTP 头和 XML 声明识别编码
+                    content = await response.read()
+
+                    etag = response.headers.get("ETag")
+                    last_modified = response.headers.get("Last-Modified")
+                    digest = None
+                    if cache_key is not None:
+                        # 响应体与上次完全相同时视为未变化，跳过解析
+                        digest = hashlib.blake2b(content, digest_size=16).digest()
+                        if self._body_hashes.get(cache_key) == digest:
+                            logger.debug("RSS内容未变化 %s", url)
+                            self.set_validators(cache_key, etag, last_modified)
+                            return NOT_MODIFIED
+
+                    # 在进程池中运行解析，避免阻塞事件循环
+                    feed, warning = await self._parse(
+                        content, response.headers.get("Content-Type", ""), transform, transform_args
+                    )
 
                     # 检查是否成功解析
-                    if hasattr(feed, "bozo") and feed.bozo and feed.bozo_exception:
-                        logger.warning(f"RSS解析警告 {url}: {feed.bozo_exception}")
+                    if warning:
+                        logger.warning("RSS解析警告 %s: %s", url, warning)
 
+                    # 解析成功后才记录校验值和摘要，否则重试会被 304 判定为未变化而漏掉新条目
+                    if cache_key is not None:
+                        self.set_validators(cache_key, etag, last_modified)
+                        self._body_hashes[cache_key] = digest
                     return feed
                 else:
-                    logger.error(f"获取RSS失败 {url}: HTTP {response.status}")
+                    logger.error("获取RSS失败 %s: HTTP %s", url, response.status)
                     return None
         except aiohttp.ClientError as e:
-            logger.error(f"获取RSS网络错误 {url}: {e}")
+            logger.error("获取RSS网络错误 %s: %s", url, e)
             return None
         except Exception as e:
-            logger.error(f"获取RSS失败 {url}: {e}")
+            logger.error("获取RSS失败 %s: %s", url, e)
             return None
 
-    async def fetch_with_retry(self, url: str, max_retries: int = 3) -> dict | None:
+    async def fetch_with_retry(
+        self,
+        url: str,
+        max_retries: int = 3,
+        cache_key: str | None = None,
+        transform: Callable | None = None,
+        transform_args: tuple = (),
+    ) -> Any:
         """带重试的获取
 
         Args:
             url: RSS地址
             max_retries: 最大重试次数
+            cache_key: 条件请求状态的键（通常为订阅ID），见 fetch
+            transform: 解析后的处理函数，见 fetch
+            transform_args: transform 的额外参数
 
         Returns:
-            解析后的feed数据，失败返回None
+            解析后的feed数据；内容未变化时返回 NOT_MODIFIED；失败返回None
         """
-        import asyncio
-
         for attempt in range(max_retries):
-            result = await self.fetch(url)
-            if result:
+            result = await self.fetch(url, cache_key, transform, transform_args)
+            if result is not None:
                 return result
 
             if attempt < max_retries - 1:
                 wait_time = 2**attempt  # 指数退避
-                logger.info(f"重试获取RSS {url}，等待 {wait_time} 秒...")
+                logger.info("重试获取RSS %s，等待 %d 秒...", url, wait_time)
                 await asyncio.sleep(wait_time)
 
-        logger.error(f"获取RSS最终失败 {url}，已重试 {max_retries} 次")
+        logger.error("获取RSS最终失败 %s，已重试 %d 次", url, max_retries)
         return None
 
     async def close(self):
         """关闭会话"""
+        self._shutdown_parse_pool()
         if self.session:
             await self.session.close()
             self.session = None
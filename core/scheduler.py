@@ -1,17 +1,98 @@
 """调度器模块"""
 
-from datetime import datetime
+import asyncio
+import heapq
+import statistics
+import struct
+import time
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
 from astrbot.api import logger
 
 from ..utils.parser import RSSParser
+from ..utils.time_filter import TimeFilter
 from .pusher import Pusher
-from .rss_fetcher import RSSFetcher
+from .rss_fetcher import NOT_MODIFIED, RSSFetcher
 from .storage import Storage
 from .subscription_manager import SubscriptionManager
 
+# 待推送条目都带有发布时间，直接按字段排序（C 实现的取值函数）
+_BY_PUBDATE = itemgetter("pubDate")
+
+
+def _parse_entries(feed_data, baseline: datetime | None) -> list[dict]:
+    """解析条目（与 feed 解析在同一个工作进程中运行，见 RSSFetcher.fetch 的 transform）
+
+    有基准线时只完整解析晚于基准线的条目；冷启动时只需要最新一条
+    """
+    return RSSParser.parse_entries(feed_data, since=baseline, latest_only=baseline is None)
+
+
+def _sub_state(sub) -> tuple:
+    """订阅在检查过程中可能变化的字段快照"""
+    return (sub.last_pub_date, sub.last_error, sub.etag, sub.last_modified)
+
+
+# NTP 时间戳起点 (1900-01-01) 与 Unix 时间戳起点之差
+_NTP_EPOCH_DELTA = 2208988800
+# 并发查询的 NTP 服务器，取各自偏差的中位数
+_NTP_SERVERS = ("ntp.aliyun.com", "ntp.tencent.com", "pool.ntp.org", "time.cloudflare.com")
+# 每次轮询最多向测量偏差靠拢的秒数，避免重新同步后调度时间突变导致重复或漏跑
+_MAX_SLEW = 2.0
+
+
+class _SNTPProtocol(asyncio.DatagramProtocol):
+    """单次 SNTP 请求的 UDP 协议"""
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+
+    def datagram_received(self, data, addr):
+        if not self.future.done():
+            self.future.set_result((data, time.time()))
+
+    def error_received(self, exc):
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+
+async def _sntp_offset(host: str, timeout: float = 3) -> tuple[float, float]:
+    """通过一次 SNTP 查询计算时间偏差
+
+    Returns:
+        (偏差, 往返时延)，偏差为 网络时间 - 本地时间，单位秒
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: _SNTPProtocol(future), remote_addr=(host, 123)
+    )
+    try:
+        # LI=0, VN=3, Mode=3 (client)
+        packet = b"\x1b" + 47 * b"\0"
+        sent_at = time.time()
+        transport.sendto(packet)
+        data, received_at = await asyncio.wait_for(future, timeout)
+    finally:
+        transport.close()
+
+    if len(data) < 48:
+        raise ValueError("SNTP 响应长度异常")
+    recv_sec, recv_frac, tx_sec, tx_frac = struct.unpack("!4I", data[32:48])
+    if tx_sec == 0:
+        raise ValueError("SNTP 响应缺少发送时间戳")
+    server_recv = recv_sec - _NTP_EPOCH_DELTA + recv_frac / 2**32
+    server_tx = tx_sec - _NTP_EPOCH_DELTA + tx_frac / 2**32
+    offset = ((server_recv - sent_at) + (server_tx - received_at)) / 2
+    delay = (received_at - sent_at) - (server_tx - server_recv)
+    return offset, delay
+
 
 class RSSScheduler:
     """RSS订阅调度器"""
@@ -23,35 +104,62 @@ class RSSScheduler:
         pusher: Pusher,
         storage: Storage,
         interval: int = 30,
+        max_concurrency: int = 10,
     ):
         self.sub_manager = sub_manager
         self.fetcher = fetcher
         self.pusher = pusher
         self.storage = storage
         self.interval = interval
+        self.max_concurrency = max(1, max_concurrency)  # 同时检查的订阅数
         self.scheduler = AsyncIOScheduler()
         self.parser = RSSParser()
-        self.time_offset = 0  # 网络时间 - 本地时间
+        # 网络时间 - 本地时间：measured_offset 为最新测量（滤波后）的偏差，
+        # effective_offset 为调度实际使用的偏差，每次轮询最多调整 _MAX_SLEW 秒
+        self.measured_offset = 0.0
+        self.effective_offset = 0.0
+        # 偏差/漂移滤波器：定期同步的测量值经滤波后得到 measured_offset
+        self.clock = TimeFilter()
 
     async def get_network_time_offset(self):
-        """获取网络时间偏差 (网络时间 - 本地时间)"""
+        """获取网络时间偏差 (网络时间 - 本地时间)
+
+        并发向多个 NTP 服务器发起 SNTP 查询并取偏差中位数（剔除个别异常服务器），
+        全部失败时（如 UDP 123 端口被屏蔽）退回 HTTP Date 头
+        """
+        results = await asyncio.gather(
+            *(_sntp_offset(host) for host in _NTP_SERVERS), return_exceptions=True
+        )
+        samples = []
+        for host, result in zip(_NTP_SERVERS, results):
+            if isinstance(result, Exception):
+                logger.debug("尝试从 NTP %s 获取时间失败: %s", host, result)
+            else:
+                samples.append(result)
+        if samples:
+            offset = statistics.median(s[0] for s in samples)
+            delay = statistics.median(s[1] for s in samples)
+            self._record_offset(offset, max(delay, 0) / 2)
+            logger.info(
+                "成功获取网络时间，偏差: %.3f秒 (NTP 中位数, %d/%d 个服务器)",
+                self.measured_offset, len(samples), len(_NTP_SERVERS),
+            )
+            return self.measured_offset
+
         urls = [
             "https://www.baidu.com",
             "https://www.taobao.com",
             "https://www.google.com",
         ]
         import email.utils
-        import time
-        
+
         for url in urls:
             try:
-                # 使用 fetcher 的 session 但不解析内容，只拿头部
-                if not self.fetcher.session:
-                    import aiohttp
-                    self.fetcher.session = aiohttp.ClientSession(timeout=self.fetcher.timeout)
+                # 使用 fetcher 的共享 session 但不解析内容，只拿头部
+                session = self.fetcher.get_session()
                 
                 start_local = time.time()
-                async with self.fetcher.session.head(url, timeout=5) as resp:
+                async with session.head(url, timeout=5) as resp:
                     # 获取 Date 响应头以同步网络时间
                     headers = resp.headers
                     date_str = None
@@ -69,135 +177,246 @@ class RSSScheduler:
                             # 网络时间 = 头部时间 + RTT/2
                             network_at = net_timestamp + (rtt / 2)
                             local_at = time.time()
-                            self.time_offset = network_at - local_at
-                            logger.info(f"成功获取网络时间，偏差: {self.time_offset:.2f}秒 (URL: {url})")
-                            return self.time_offset
+                            # Date 头只有秒级精度
+                            self._record_offset(network_at - local_at, rtt / 2 + 1)
+                            logger.info("成功获取网络时间，偏差: %.2f秒 (URL: %s)", self.measured_offset, url)
+                            return self.measured_offset
             except Exception as e:
                 logger.debug(f"尝试从 {url} 获取时间失败: {e}")
                 continue
         
+        if self.clock.ready:
+            # 本次同步失败，按已有的偏差/漂移模型外推
+            self.measured_offset = self.clock.offset_at(time.time())
+            logger.warning("未能获取网络时间，按时钟漂移模型估计偏差: %.3f秒", self.measured_offset)
+            return self.measured_offset
+
         logger.warning("未能获取网络时间，将使用系统时间")
         return 0
 
+    def _record_offset(self, offset: float, max_error: float):
+        """将一次偏差测量加入滤波器，并更新当前偏差估计"""
+        now = time.time()
+        self.clock.update(offset, max_error, now)
+        self.measured_offset = self.clock.offset_at(now)
+
+    async def resync_time(self):
+        """定期重新同步网络时间，新偏差在之后的轮询中逐步生效"""
+        await self.get_network_time_offset()
+
+    def _slew_offset(self):
+        """让调度使用的偏差向测量偏差平滑靠拢，每次最多调整 _MAX_SLEW 秒"""
+        delta = self.measured_offset - self.effective_offset
+        step = max(-_MAX_SLEW, min(_MAX_SLEW, delta))
+        if abs(step) < 0.01:
+            return
+        self.effective_offset += step
+        if self.scheduler.get_job("rss_polling"):
+            # 在轮询任务运行期间调用：下一次运行时间须从当前时段之后算起，
+            # 否则偏差减小时新触发器会把刚运行过的时段推迟 step 秒后再触发一次
+            trigger = self._aligned_trigger()
+            after = datetime.now(timezone.utc) + timedelta(seconds=_MAX_SLEW + 1)
+            self.scheduler.modify_job(
+                "rss_polling",
+                trigger=trigger,
+                next_run_time=trigger.get_next_fire_time(None, after),
+            )
+        logger.debug(
+            "调度时间偏差调整 %+.3f秒，当前 %.3f秒 (测量 %.3f秒)",
+            step, self.effective_offset, self.measured_offset,
+        )
+
+    def _aligned_trigger(self) -> BaseTrigger:
+        """构建按网络时间对齐的触发器
+
+        间隔能整除小时/天时使用 Cron 触发器；否则使用以网络时间当天零点为起点的
+        固定间隔触发器，由 APScheduler 按起点推算下一次对齐时间
+        """
+        # 以 "本地UTC偏移 + 网络时间偏差" 作为时区，使触发器按网络时间的整点计算
+        local_offset = datetime.now().astimezone().utcoffset() or timedelta()
+        tz = timezone(local_offset + timedelta(seconds=self.effective_offset))
+
+        hours, rest = divmod(self.interval, 60)
+        if self.interval < 60 and 60 % self.interval == 0:
+            return CronTrigger(minute=f"*/{self.interval}", timezone=tz)
+        if hours and not rest and 24 % hours == 0:
+            return CronTrigger(hour=f"*/{hours}" if hours < 24 else 0, minute=0, timezone=tz)
+
+        midnight = datetime.now(tz).replace(hour=0, minute=0, second=0, microsecond=0)
+        return IntervalTrigger(minutes=self.interval, start_date=midnight, timezone=tz)
+
+    def _add_resync_job(self):
+        """每小时重新同步一次网络时间，跟踪本地时钟漂移"""
+        self.scheduler.add_job(
+            self.resync_time,
+            "interval",
+            minutes=60,
+            id="time_resync",
+            replace_existing=True,
+            coalesce=True,
+        )
+
     async def start(self):
         """启动调度器"""
         try:
-            # 获取网络时间偏差
+            # 获取网络时间偏差，尚未排定任何任务，直接全部生效
             await self.get_network_time_offset()
+            self.effective_offset = self.measured_offset
 
-            from datetime import datetime, timedelta
-            now_local = datetime.now()
-            now_net = now_local + timedelta(seconds=self.time_offset)
-            
-            # 计算下一次对齐点（网络时间）
-            if self.interval < 60:
-                # 对齐到下一个 interval 分钟的整点
-                next_min = ((now_net.minute // self.interval) + 1) * self.interval
-                next_net = now_net.replace(minute=0, second=0, microsecond=0) + timedelta(minutes=next_min)
-            else:
-                # 对齐到下一个整小时
-                hours = self.interval // 60
-                next_hour = ((now_net.hour // hours) + 1) * hours
-                next_net = now_net.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(hours=next_hour)
-            
-            # 转换为本地时间
-            start_date_local = next_net - timedelta(seconds=self.time_offset)
-            
-            # 如果 start_date 太近（比如小于 5 秒），APScheduler 可能会报错，往后推一个周期
-            if (start_date_local - now_local).total_seconds() < 5:
-                start_date_local += timedelta(minutes=self.interval)
-                next_net += timedelta(minutes=self.interval)
-
-            logger.info(
-                f"RSS调度器启动: 间隔 {self.interval} 分钟. "
-                f"预定网络时间 {next_net.strftime('%H:%M:%S')} (本地时间 {start_date_local.strftime('%H:%M:%S')}) 开始对齐运行"
-            )
-
-            # 添加轮询任务
+            # 触发器每次都按当前时钟推算下一次时间，系统时钟跳变后不会累积漂移
             self.scheduler.add_job(
                 self.check_all_subscriptions,
-                "interval",
-                minutes=self.interval,
-                start_date=start_date_local,
+                self._aligned_trigger(),
                 id="rss_polling",
                 replace_existing=True,
+                coalesce=True,
+                misfire_grace_time=60,
+            )
+            self._add_resync_job()
+            # 定期更新数据库索引统计信息
+            self.scheduler.add_job(
+                self.storage.optimize,
+                "interval",
+                minutes=15,
+                id="db_optimize",
+                replace_existing=True,
+                coalesce=True,
             )
-
             self.scheduler.start()
+
+            next_run = self.scheduler.get_job("rss_polling").next_run_time
+            logger.info(
+                "RSS调度器启动: 间隔 %d 分钟, 按网络时间对齐运行, 下次运行 %s (网络时间偏差 %.2f秒)",
+                self.interval, next_run.strftime("%H:%M:%S"), self.effective_offset,
+            )
         except Exception as e:
             logger.error(f"启动调度器失败: {e}")
 
     async def check_all_subscriptions(self):
         """检查所有启启用用的订阅"""
         logger.info("开始检查所有RSS订阅...")
+        self._slew_offset()
 
         enabled_subs = self.sub_manager.list_enabled()
-        logger.info(f"启用的订阅数: {len(enabled_subs)}")
+        logger.info("启用的订阅数: %d", len(enabled_subs))
+
+        if not enabled_subs:
+            return
 
+        # 固定数量的工作协程从队列中取订阅检查，任务数不随订阅数增长
+        queue: asyncio.Queue = asyncio.Queue()
         for sub in enabled_subs:
-            try:
-                await self.check_subscription(sub)
-            except Exception as e:
-                logger.error(f"检查订阅期内异常 {sub.name}: {e}")
-                sub.last_error = str(e)
-                self.sub_manager.update_subscription(sub)
+            queue.put_nowait(sub)
+
+        async def worker():
+            while True:
+                sub = await queue.get()
+                try:
+                    await self._check_subscription(sub)
+                except Exception as e:
+                    logger.error("检查订阅期内异常 %s: %s", sub.name, e)
+                    sub.last_error = str(e)
+                    self.sub_manager.mark_dirty(sub)
+                finally:
+                    queue.task_done()
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(self.max_concurrency, len(enabled_subs)))
+        ]
+        try:
+            await queue.join()
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            # 整轮检查结束后一次性保存所有变更的订阅
+            self.sub_manager.flush_dirty()
 
     async def check_subscription(self, sub):
-        """检查单个订阅"""
-        logger.info(f"检查订阅: {sub.name}")
+        """检查单个订阅，并立即保存其状态变更"""
+        try:
+            await self._check_subscription(sub)
+        finally:
+            self.sub_manager.flush_dirty()
+
+    async def _check_subscription(self, sub):
+        """检查单个订阅（状态变更只标记，由调用方统一保存）"""
+        logger.info("检查订阅: %s", sub.name)
+        before = _sub_state(sub)
 
         try:
-            # 获取RSS内容
-            feed_data = await self.fetcher.fetch_with_retry(sub.url)
+            # 重启后从订阅中恢复条件请求校验值
+            if sub.etag or sub.last_modified:
+                if self.fetcher.get_validators(sub.id) == (None, None):
+                    self.fetcher.set_validators(sub.id, sub.etag, sub.last_modified)
 
-            if not feed_data:
-                logger.warning(f"获取RSS失败: {sub.url}")
-                return
+            # 确定基准线 (Baseline)
+            baseline = sub.last_pub_date
 
-            # 解析条目
-            import asyncio
-            loop = asyncio.get_event_loop()
-            entries = await loop.run_in_executor(None, self.parser.parse_entries, feed_data)
+            # 获取RSS内容，并在解析 feed 的同一个工作进程中解析条目（只解析基准线之后的条目）
+            entries = await self.fetcher.fetch_with_retry(
+                sub.url, cache_key=sub.id, transform=_parse_entries, transform_args=(baseline,)
+            )
 
-            if not entries:
+            if entries is None:
+                logger.warning("获取RSS失败: %s", sub.url)
                 return
 
-            # 过滤掉没有发布时间的条目
-            valid_entries = [e for e in entries if e.get("pubDate")]
-            if not valid_entries:
+            # 记录最新的校验值，随下一次订阅保存一并持久化
+            sub.etag, sub.last_modified = self.fetcher.get_validators(sub.id)
+
+            if entries is NOT_MODIFIED:
+                # 服务器返回 304，内容未变化，无需解析
+                logger.info("订阅未更新: %s", sub.name)
                 return
 
-            # 按发布时间由旧到新排序
-            valid_entries.sort(key=lambda x: x["pubDate"])
+            if not entries:
+                return
 
             to_push = []
-            
-            # 确定基准线 (Baseline)
-            baseline = sub.last_pub_date
+
+            # 单次遍历：跳过没有发布时间的条目，同时找出最新条目并收集晚于基准线的候选条目
+            latest_entry = None
+            latest_date = None
+            candidates = []
+            for e in entries:
+                pub_date = e.get("pubDate")
+                if not pub_date:
+                    continue
+                if latest_date is None or pub_date > latest_date:
+                    latest_entry, latest_date = e, pub_date
+                if baseline is not None and pub_date > baseline and e.get("guid"):
+                    candidates.append(e)
+
+            if latest_entry is None:
+                return
 
             if baseline is None:
                 # 冷启动: 仅推送最新一条
-                latest_entry = valid_entries[-1]
-                logger.info(f"冷启动: {sub.name} -> {latest_entry.get('title')}")
+                logger.info("冷启动: %s -> %s", sub.name, latest_entry.get("title"))
                 to_push = [latest_entry]
+            elif not candidates:
+                # 没有晚于基准线的条目：无新内容，直接返回
+                return
             else:
-                # 增量推送
-                for entry in valid_entries:
-                    if entry["pubDate"] > baseline:
-                        guid = entry.get("guid")
-                        if guid and not self.storage.is_pushed(str(guid), sub.id):
-                            to_push.append(entry)
+                # 增量推送：一次查询过滤掉已推送的条目
+                pushed = self.storage.filter_pushed(
+                    [str(e["guid"]) for e in candidates], sub.id
+                )
+                to_push = [e for e in candidates if str(e["guid"]) not in pushed]
                 
                 if to_push:
-                    logger.info(f"发现新动态: {sub.name} ({len(to_push)}条)")
+                    logger.info("发现新动态: %s (%d条)", sub.name, len(to_push))
 
             if not to_push:
                 return
 
-            # 限制单次推送数量
+            # 限制单次推送数量：只保留最新的 max_limit 条，并按发布时间由旧到新推送
             max_limit = 10
             if len(to_push) > max_limit:
-                to_push = to_push[-max_limit:]
+                to_push = heapq.nlargest(max_limit, to_push, key=_BY_PUBDATE)
+            to_push.sort(key=_BY_PUBDATE)
 
             # 执行推送
             await self.pusher.push(sub, to_push)
@@ -206,15 +425,21 @@ class RSSScheduler:
             sub.last_pub_date = to_push[-1]["pubDate"]
             sub.last_error = None  # 运行成功，清除错误信息
             
-            for entry in to_push:
-                self.storage.mark_pushed(entry["guid"], sub.id, entry["pubDate"])
-
-            self.sub_manager.update_subscription(sub)
+            self.storage.mark_pushed_many(
+                [(entry["guid"], sub.id, entry["pubDate"]) for entry in to_push]
+            )
 
         except Exception as e:
-            logger.error(f"检查订阅异常 {sub.name}: {e}")
+            logger.error("检查订阅异常 %s: %s", sub.name, e)
+            # 本次内容未处理完，下次轮询不能再被判定为未变化：
+            # 同时清除订阅上的校验值，否则下次检查会从订阅中把它们恢复回去
+            self.fetcher.invalidate(sub.id)
+            sub.etag = sub.last_modified = None
             sub.last_error = str(e)
-            self.sub_manager.update_subscription(sub)
+        finally:
+            # 每次检查最多写回一次，且只在状态确有变化时写回（含各提前返回分支）
+            if _sub_state(sub) != before:
+                self.sub_manager.mark_dirty(sub)
 
     def stop(self):
         """停止调度器"""
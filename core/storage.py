@@ -1,14 +1,43 @@
 """数据持久化模块"""
 
+import copy
 import json
+import os
 import sqlite3
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from pathlib import Path
 
 from astrbot.api import logger
 
+from ..utils.bloom_filter import BloomFilter
 from .subscription import Subscription, Target
 
+# 固定的 SQL 文本，保证命中连接上的预编译语句缓存
+_SQL_LOAD_SUBS = (
+    "SELECT id, name, url, enabled, last_pub_date, last_error, template, filters, max_items, "
+    "etag, last_modified FROM subscriptions"
+)
+_SQL_LOAD_TARGETS = "SELECT subscription_id, type, platform, target_id FROM targets"
+_SQL_UPSERT_SUB = (
+    "INSERT INTO subscriptions (id, name, url, enabled, last_pub_date, last_error, template, "
+    "filters, max_items, etag, last_modified) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(id) DO UPDATE SET name = excluded.name, url = excluded.url, "
+    "enabled = excluded.enabled, last_pub_date = excluded.last_pub_date, "
+    "last_error = excluded.last_error, template = excluded.template, filters = excluded.filters, "
+    "max_items = excluded.max_items, etag = excluded.etag, last_modified = excluded.last_modified"
+)
+_SQL_DELETE_SUB = "DELETE FROM subscriptions WHERE id = ?"
+_SQL_INSERT_TARGET = "INSERT INTO targets (subscription_id, type, platform, target_id) VALUES (?, ?, ?, ?)"
+_SQL_DELETE_TARGETS = "DELETE FROM targets WHERE subscription_id = ?"
+_SQL_IS_PUSHED = "SELECT 1 FROM pushed_items WHERE guid = ? AND subscription_id = ?"
+_SQL_INSERT_PUSHED = "INSERT OR REPLACE INTO pushed_items (guid, subscription_id, pub_date) VALUES (?, ?, ?)"
+_SQL_DELETE_OLD_PUSHED = "DELETE FROM pushed_items WHERE pub_date < ?"
+
+# 数据库结构版本（PRAGMA user_version），与之相同时启动跳过建表检查和各项迁移
+_SCHEMA_VERSION = 1
+
 
 class Storage:
     """数据存储管理器"""
@@ -18,13 +47,86 @@ class Storage:
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.subs_file = self.data_dir / "subscriptions.json"
         self.db_file = self.data_dir / "pushed_items.db"
+        # 每个订阅的已推送 GUID 布隆过滤器；加载失败时不走快速路径
+        self._blooms: dict[str, BloomFilter] = {}
+        self._blooms_ready = False
+        # 最近查询过的 (订阅ID, GUID) -> 是否已推送，LRU 淘汰
+        self._pushed_cache: OrderedDict[tuple[str, str], bool] = OrderedDict()
+        self._pushed_cache_cap = 10000
+        # 每个订阅最近一次写入/读取的推送目标，目标未变化时保存订阅不重写 targets 表
+        self._saved_targets: dict[str, tuple] = {}
+        # 每个订阅最近一次序列化的过滤规则 (规则副本, JSON 文本)，规则未变化时直接复用 JSON
+        self._saved_filters: dict[str, tuple[dict, str | None]] = {}
+        # 长连接（惰性创建），所有读写共用并由锁串行化
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+        self._writable = True  # 由 _init_db 检查，只读时不切换 WAL
         self._init_db()
         self.cleanup_old_records(30)  # 启动时清理 30 天前的旧记录
+        self._load_blooms()
+        self.optimize()
+
+    def _connect(self, **kwargs) -> sqlite3.Connection:
+        """打开数据库连接并统一设置 PRAGMA"""
+        conn = sqlite3.connect(str(self.db_file), cached_statements=128, **kwargs)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA busy_timeout=5000")
+        if self._writable:
+            try:
+                # WAL 模式下读写互不阻塞；NORMAL 同步级别在 WAL 下仍保证一致性
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            except sqlite3.Error as e:
+                logger.warning("设置数据库 WAL 模式失败: %s", e)
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-20000")
+        conn.execute("PRAGMA mmap_size=134217728")
+        return conn
+
+    def _get_conn(self) -> sqlite3.Connection:
+        """获取共享的数据库连接，首次使用时创建"""
+        if self._conn is None:
+            self._conn = self._connect(check_same_thread=False)
+        return self._conn
+
+    def optimize(self):
+        """让 SQLite 按需更新索引统计信息（PRAGMA optimize），保持查询计划随数据增长仍然有效"""
+        if not self._writable:
+            return
+        try:
+            with self._lock:
+                self._get_conn().execute("PRAGMA optimize")
+        except Exception as e:
+            logger.debug("PRAGMA optimize 失败: %s", e)
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self.optimize()
+                self._conn.close()
+                self._conn = None
+
+    def _load_blooms(self):
+        """从推送记录构建布隆过滤器"""
+        try:
+            with self._lock:
+                cursor = self._get_conn().execute("SELECT subscription_id, guid FROM pushed_items")
+                for sub_id, guid in cursor:
+                    self._bloom_for(sub_id).add(guid)
+            self._blooms_ready = True
+        except Exception as e:
+            logger.error("加载推送记录布隆过滤器失败: %s", e)
+
+    def _bloom_for(self, sub_id: str) -> BloomFilter:
+        """获取（必要时创建）订阅对应的布隆过滤器"""
+        bloom = self._blooms.get(sub_id)
+        if bloom is None:
+            bloom = self._blooms[sub_id] = BloomFilter(capacity=10000, error_rate=0.001)
+        return bloom
 
     def _init_db(self):
         """初始化SQLite数据库"""
-        import os
-        
         # 预检查权限
         is_writable = True
         if self.db_file.exists() and not os.access(self.db_file, os.W_OK):
@@ -34,18 +136,23 @@ class Storage:
 
         if not is_writable:
             logger.warning(f"⚠️ 数据库或目录只读: {self.db_file}。将跳过所有写入和自动迁移。")
+        self._writable = is_writable
 
-        conn = sqlite3.connect(str(self.db_file))
+        conn = self._connect()
         cursor = conn.cursor()
-        
+        migrated = True  # 所有迁移是否都已成功
+
         try:
+            if cursor.execute("PRAGMA user_version").fetchone()[0] >= _SCHEMA_VERSION:
+                return
+
             if is_writable:
                 # 1. 创建推送记录表
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS pushed_items (
                         guid TEXT,
                         subscription_id TEXT,
-                        pub_date TIMESTAMP,
+                        pub_date INTEGER,
                         PRIMARY KEY (guid, subscription_id)
                     )
                 """)
@@ -59,6 +166,8 @@ class Storage:
                         enabled INTEGER DEFAULT 1,
                         last_pub_date TIMESTAMP,
                         last_error TEXT,
+                        etag TEXT,
+                        last_modified TEXT,
                         template TEXT,
                         filters TEXT,
                         max_items INTEGER DEFAULT 1
@@ -68,7 +177,7 @@ class Storage:
             # 3. 检查列信息
             cursor.execute("PRAGMA table_info(subscriptions)")
             current_columns = {col[1] for col in cursor.fetchall()}
-            core_cols = {'id', 'name', 'url', 'enabled', 'last_pub_date', 'last_error', 'template', 'filters', 'max_items'}
+            core_cols = {'id', 'name', 'url', 'enabled', 'last_pub_date', 'last_error', 'etag', 'last_modified', 'template', 'filters', 'max_items'}
             
             missing_cols = core_cols - current_columns
             has_extra_cols = len(current_columns) > len(core_cols)
@@ -93,6 +202,8 @@ class Storage:
                                 enabled INTEGER DEFAULT 1,
                                 last_pub_date TIMESTAMP,
                                 last_error TEXT,
+                                etag TEXT,
+                                last_modified TEXT,
                                 template TEXT,
                                 filters TEXT,
                                 max_items INTEGER DEFAULT 1
@@ -106,6 +217,7 @@ class Storage:
                         logger.info("数据库 subscriptions 表迁移成功")
                     except Exception as e:
                         conn.rollback()
+                        migrated = False
                         logger.error(f"迁移 subscriptions 失败: {e}")
 
             if is_writable:
@@ -132,7 +244,7 @@ class Storage:
                             CREATE TABLE pushed_items (
                                 guid TEXT,
                                 subscription_id TEXT,
-                                pub_date TIMESTAMP,
+                                pub_date INTEGER,
                                 PRIMARY KEY (guid, subscription_id)
                             )
                         """)
@@ -141,34 +253,39 @@ class Storage:
                         conn.commit()
                     except Exception as e:
                         conn.rollback()
+                        migrated = False
                         logger.error(f"清理 pushed_items 失败: {e}")
 
-                # 6. JSON 迁移
-                if self.subs_file.exists():
-                    cursor.execute("SELECT COUNT(*) FROM subscriptions")
-                    if cursor.fetchone()[0] == 0:
-                        logger.info("迁移 legacy subscriptions.json...")
+                # 推送记录的发布时间由 ISO 文本迁移为 Unix 时间戳（整数比较更快、占用更小）
+                cursor.execute("SELECT rowid, pub_date FROM pushed_items WHERE typeof(pub_date) = 'text'")
+                legacy_rows = cursor.fetchall()
+                if legacy_rows:
+                    updates = []
+                    for rowid, value in legacy_rows:
                         try:
-                            with open(self.subs_file, encoding="utf-8") as f:
-                                subs_data = json.load(f)
-                            for sub_data in subs_data:
-                                cursor.execute("""
-                                    INSERT INTO subscriptions (id, name, url, enabled, last_error, template, filters, max_items)
-                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                                """, (
-                                    sub_data.get("id"), sub_data.get("name"), sub_data.get("url"),
-                                    1 if sub_data.get("enabled", True) else 0,
-                                    sub_data.get("stats", {}).get("last_error"),
-                                    sub_data.get("template"),
-                                    json.dumps(sub_data.get("filters", {})),
-                                    sub_data.get("max_items", 1)
-                                ))
-                            conn.commit()
-                            logger.info("JSON 数据迁移完成")
-                            self.subs_file.rename(self.subs_file.with_suffix('.json.bak'))
-                        except Exception as e:
-                            logger.error(f"JSON 迁移失败: {e}")
-                            conn.rollback()
+                            ts = int(datetime.fromisoformat(value).timestamp())
+                        except ValueError:
+                            # 无法解析的旧值按当前时间处理，到期后随清理删除
+                            ts = int(datetime.now().timestamp())
+                        updates.append((ts, rowid))
+                    cursor.executemany("UPDATE pushed_items SET pub_date = ? WHERE rowid = ?", updates)
+                    conn.commit()
+                    logger.info("已将 %d 条推送记录的发布时间迁移为时间戳", len(updates))
+
+                # 清理旧记录按发布时间范围删除
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_pushed_pubdate ON pushed_items(pub_date)"
+                )
+                # 按订阅删除/重写推送目标
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_targets_sub ON targets(subscription_id)"
+                )
+
+                # 6. JSON 迁移
+                migrated = self._migrate_json(conn) and migrated
+
+                if migrated:
+                    cursor.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
 
             conn.commit()
         except Exception as e:
@@ -176,104 +293,279 @@ class Storage:
         finally:
             conn.close()
 
+    def _migrate_json(self, conn: sqlite3.Connection) -> bool:
+        """将旧版 subscriptions.json 导入数据库（仅在订阅表为空时）
+
+        Returns:
+            是否无需迁移或迁移成功
+        """
+        if not self.subs_file.exists():
+            return True
+        if conn.execute("SELECT COUNT(*) FROM subscriptions").fetchone()[0]:
+            return True
+
+        logger.info("迁移 legacy subscriptions.json...")
+        try:
+            with open(self.subs_file, encoding="utf-8") as f:
+                subs_data = json.load(f)
+            conn.executemany("""
+                INSERT INTO subscriptions (id, name, url, enabled, last_error, template, filters, max_items)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (
+                    sub_data.get("id"), sub_data.get("name"), sub_data.get("url"),
+                    1 if sub_data.get("enabled", True) else 0,
+                    sub_data.get("stats", {}).get("last_error"),
+                    sub_data.get("template"),
+                    json.dumps(sub_data.get("filters", {})),
+                    sub_data.get("max_items", 1)
+                )
+                for sub_data in subs_data
+            ])
+            conn.commit()
+            logger.info("JSON 数据迁移完成")
+            os.replace(self.subs_file, self.subs_file.with_suffix('.json.bak'))
+            return True
+        except Exception as e:
+            logger.error("JSON 迁移失败: %s", e)
+            conn.rollback()
+            return False
+
     def load_subscriptions(self) -> list[Subscription]:
         """加载所有订阅"""
         try:
-            conn = sqlite3.connect(str(self.db_file))
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, name, url, enabled, last_pub_date, last_error, template, filters, max_items FROM subscriptions")
-            
-            subscriptions = []
-            for row in cursor.fetchall():
-                last_pub_date = datetime.fromisoformat(row[4]) if row[4] else None
-                filters = {}
-                if row[7]:
-                    try: filters = json.loads(row[7])
-                    except: pass
-                
-                # 加载目标
-                cursor.execute("SELECT type, platform, target_id FROM targets WHERE subscription_id = ?", (row[0],))
-                targets = [Target(type=t[0], platform=t[1], id=t[2]) for t in cursor.fetchall()]
-                
-                sub = Subscription(
-                    id=row[0], name=row[1], url=row[2], enabled=bool(row[3]),
-                    last_pub_date=last_pub_date, last_error=row[5], targets=targets,
-                    template=row[6], filters=filters, max_items=row[8]
-                )
-                subscriptions.append(sub)
-            conn.close()
-            return subscriptions
+            with self._lock:
+                conn = self._get_conn()
+                # 一次查询取出全部推送目标，按订阅分组
+                targets_by_sub: dict[str, list[Target]] = {}
+                for row in conn.execute(_SQL_LOAD_TARGETS):
+                    targets_by_sub.setdefault(row["subscription_id"], []).append(
+                        Target(type=row["type"], platform=row["platform"], id=row["target_id"])
+                    )
+
+                self._saved_targets = {
+                    sub_id: self._targets_key(targets) for sub_id, targets in targets_by_sub.items()
+                }
+                subscriptions = []
+                for row in conn.execute(_SQL_LOAD_SUBS):
+                    last_pub_date = datetime.fromisoformat(row["last_pub_date"]) if row["last_pub_date"] else None
+                    filters = {}
+                    if row["filters"]:
+                        try: filters = json.loads(row["filters"])
+                        except: pass
+                        else: self._saved_filters[row["id"]] = (copy.deepcopy(filters), row["filters"])
+
+                    sub = Subscription(
+                        id=row["id"], name=row["name"], url=row["url"], enabled=bool(row["enabled"]),
+                        last_pub_date=last_pub_date, last_error=row["last_error"],
+                        targets=targets_by_sub.get(row["id"], []),
+                        template=row["template"], filters=filters, max_items=row["max_items"],
+                        etag=row["etag"], last_modified=row["last_modified"]
+                    )
+                    subscriptions.append(sub)
+                return subscriptions
         except Exception as e:
             logger.error(f"加载订阅失败: {e}")
             return []
 
+    @staticmethod
+    def _targets_key(targets: list[Target]) -> tuple:
+        """推送目标列表的可比较快照"""
+        return tuple((t.type, t.platform, t.id) for t in targets)
+
+    def _filters_json(self, sub: Subscription) -> str | None:
+        """序列化订阅的过滤规则，规则与上次相同时复用缓存的 JSON"""
+        if not sub.filters:
+            return None
+        cached = self._saved_filters.get(sub.id)
+        if cached is not None and cached[0] == sub.filters:
+            return cached[1]
+        text = json.dumps(sub.filters)
+        self._saved_filters[sub.id] = (copy.deepcopy(sub.filters), text)
+        return text
+
+    def _upsert(self, conn: sqlite3.Connection, subs: list[Subscription]):
+        """写入（插入或更新）订阅，仅重写推送目标发生变化的订阅的 targets"""
+        conn.executemany(_SQL_UPSERT_SUB, [
+            (
+                sub.id, sub.name, sub.url, 1 if sub.enabled else 0,
+                sub.last_pub_date.isoformat() if sub.last_pub_date else None,
+                sub.last_error, sub.template,
+                self._filters_json(sub),
+                sub.max_items, sub.etag, sub.last_modified
+            )
+            for sub in subs
+        ])
+        for sub in subs:
+            key = self._targets_key(sub.targets)
+            if self._saved_targets.get(sub.id, ()) == key:
+                continue
+            conn.execute(_SQL_DELETE_TARGETS, (sub.id,))
+            conn.executemany(_SQL_INSERT_TARGET, [
+                (sub.id, target.type, target.platform, target.id) for target in sub.targets
+            ])
+            self._saved_targets[sub.id] = key
+
+    def upsert_subscriptions(self, subs: list[Subscription]):
+        """保存若干个订阅（单个事务），只写入传入的订阅"""
+        if not subs:
+            return
+        with self._lock:
+            try:
+                conn = self._get_conn()
+                with conn:
+                    self._upsert(conn, subs)
+            except Exception as e:
+                # 事务已回滚，目标快照可能与数据库不一致，下次全部重写
+                self._saved_targets.clear()
+                logger.error("保存配置失败: %s", e)
+
+    def upsert_subscription(self, sub: Subscription):
+        """保存单个订阅"""
+        self.upsert_subscriptions([sub])
+
+    def delete_subscription(self, sub_id: str):
+        """删除订阅及其推送目标"""
+        with self._lock:
+            try:
+                conn = self._get_conn()
+                with conn:
+                    conn.execute(_SQL_DELETE_SUB, (sub_id,))
+                    conn.execute(_SQL_DELETE_TARGETS, (sub_id,))
+                self._saved_targets.pop(sub_id, None)
+                self._saved_filters.pop(sub_id, None)
+            except Exception as e:
+                logger.error("删除订阅失败: %s", e)
+
     def save_subscriptions(self, subs: list[Subscription]):
-        """保存订阅列表"""
-        try:
-            conn = sqlite3.connect(str(self.db_file))
-            cursor = conn.cursor()
-            cursor.execute("BEGIN TRANSACTION")
-            cursor.execute("DELETE FROM subscriptions")
-            cursor.execute("DELETE FROM targets")
-            
-            for sub in subs:
-                cursor.execute("""
-                    INSERT INTO subscriptions (id, name, url, enabled, last_pub_date, last_error, template, filters, max_items)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    sub.id, sub.name, sub.url, 1 if sub.enabled else 0,
-                    sub.last_pub_date.isoformat() if sub.last_pub_date else None,
-                    sub.last_error, sub.template,
-                    json.dumps(sub.filters) if sub.filters else None,
-                    sub.max_items
-                ))
-                for target in sub.targets:
-                    cursor.execute("INSERT INTO targets (subscription_id, type, platform, target_id) VALUES (?, ?, ?, ?)",
-                                 (sub.id, target.type, target.platform, target.id))
-            
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            logger.error(f"保存配置失败: {e}")
-            if conn:
-                conn.rollback()
-                conn.close()
+        """保存订阅列表（完整同步：写入列表中的订阅并删除列表外的订阅）"""
+        with self._lock:
+            try:
+                conn = self._get_conn()
+                with conn:
+                    self._upsert(conn, subs)
+                    keep = {sub.id for sub in subs}
+                    stale = [
+                        (row["id"],) for row in conn.execute("SELECT id FROM subscriptions")
+                        if row["id"] not in keep
+                    ]
+                    if stale:
+                        conn.executemany(_SQL_DELETE_SUB, stale)
+                        conn.executemany(_SQL_DELETE_TARGETS, stale)
+                    for (sub_id,) in stale:
+                        self._saved_targets.pop(sub_id, None)
+                        self._saved_filters.pop(sub_id, None)
+            except Exception as e:
+                self._saved_targets.clear()
+                logger.error("保存配置失败: %s", e)
+
+    def _cache_get(self, sub_id: str, guid: str) -> bool | None:
+        """查询 LRU 缓存，未命中返回 None"""
+        key = (sub_id, guid)
+        value = self._pushed_cache.get(key)
+        if value is not None:
+            self._pushed_cache.move_to_end(key)
+        return value
+
+    def _cache_put(self, sub_id: str, guid: str, pushed: bool):
+        """写入 LRU 缓存，超出容量时淘汰最久未使用的记录"""
+        key = (sub_id, guid)
+        self._pushed_cache[key] = pushed
+        self._pushed_cache.move_to_end(key)
+        if len(self._pushed_cache) > self._pushed_cache_cap:
+            self._pushed_cache.popitem(last=False)
 
     def is_pushed(self, guid: str, sub_id: str) -> bool:
         """查重检查"""
+        # 布隆过滤器判定不存在时一定未推送，无需查询数据库
+        if self._blooms_ready and guid not in self._bloom_for(sub_id):
+            return False
+        cached = self._cache_get(sub_id, guid)
+        if cached is not None:
+            return cached
         try:
-            conn = sqlite3.connect(str(self.db_file))
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1 FROM pushed_items WHERE guid = ? AND subscription_id = ?", (guid, sub_id))
-            res = cursor.fetchone()
-            conn.close()
-            return res is not None
+            with self._lock:
+                res = self._get_conn().execute(_SQL_IS_PUSHED, (guid, sub_id)).fetchone()
         except Exception:
             return False
+        self._cache_put(sub_id, guid, res is not None)
+        return res is not None
+
+    def filter_pushed(self, guids: list[str], sub_id: str) -> set[str]:
+        """批量查重，返回其中已推送过的 GUID 集合"""
+        pushed = set()
+        if self._blooms_ready:
+            # 只有布隆过滤器命中的 GUID 才需要回查数据库
+            bloom = self._bloom_for(sub_id)
+            guids = [guid for guid in guids if guid in bloom]
+        # 先查 LRU 缓存，只有未命中的 GUID 才查询数据库
+        unknown = []
+        for guid in guids:
+            cached = self._cache_get(sub_id, guid)
+            if cached is None:
+                unknown.append(guid)
+            elif cached:
+                pushed.add(guid)
+        guids = unknown
+        if not guids:
+            return pushed
+        try:
+            found = set()
+            with self._lock:
+                cursor = self._get_conn().cursor()
+                # 分批查询，避免超出 SQLite 参数数量上限
+                for i in range(0, len(guids), 500):
+                    chunk = guids[i:i + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    cursor.execute(
+                        f"SELECT guid FROM pushed_items WHERE subscription_id = ? AND guid IN ({placeholders})",
+                        (sub_id, *chunk),
+                    )
+                    found.update(row[0] for row in cursor.fetchall())
+        except Exception as e:
+            logger.error("批量查重失败: %s", e)
+            return pushed
+        for guid in guids:
+            self._cache_put(sub_id, guid, guid in found)
+        return pushed | found
 
     def mark_pushed(self, guid: str, sub_id: str, pub_date: datetime | None = None):
         """标记推送完成"""
+        self.mark_pushed_many([(guid, sub_id, pub_date)])
+
+    def mark_pushed_many(self, rows: list[tuple[str, str, datetime | None]]):
+        """批量标记推送完成（单个事务提交）
+
+        Args:
+            rows: (guid, 订阅ID, 发布时间) 列表
+        """
+        if not rows:
+            return
         try:
-            conn = sqlite3.connect(str(self.db_file))
-            cursor = conn.cursor()
-            cursor.execute("INSERT OR REPLACE INTO pushed_items (guid, subscription_id, pub_date) VALUES (?, ?, ?)",
-                         (guid, sub_id, pub_date.isoformat() if pub_date else None))
-            conn.commit()
-            conn.close()
+            with self._lock:
+                conn = self._get_conn()
+                with conn:
+                    conn.executemany(
+                        _SQL_INSERT_PUSHED,
+                        [(guid, sub_id, int(pub_date.timestamp()) if pub_date else None) for guid, sub_id, pub_date in rows],
+                    )
+            for guid, sub_id, _ in rows:
+                self._bloom_for(sub_id).add(guid)
+                self._cache_put(sub_id, guid, True)
         except Exception as e:
             logger.error(f"标记推送状态失败: {e}")
 
     def cleanup_old_records(self, days: int = 30):
         """定期清理旧 GUID 记录"""
         try:
-            cutoff = (datetime.now() - timedelta(days=days)).isoformat()
-            conn = sqlite3.connect(str(self.db_file))
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM pushed_items WHERE pub_date < ?", (cutoff,))
-            deleted = cursor.rowcount
-            conn.commit()
-            conn.close()
+            cutoff = int((datetime.now() - timedelta(days=days)).timestamp())
+            with self._lock:
+                conn = self._get_conn()
+                with conn:
+                    deleted = conn.execute(_SQL_DELETE_OLD_PUSHED, (cutoff,)).rowcount
             if deleted > 0:
+                # 已删除的记录不能再从缓存中判定为已推送
+                self._pushed_cache.clear()
                 logger.info(f"清理了 {deleted} 条超过 {days} 天的推送记录")
         except Exception as e:
             logger.error(f"清理失败: {e}")
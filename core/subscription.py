@@ -1,11 +1,19 @@
 """订阅数据模型"""
 
 import uuid
-from dataclasses import asdict, dataclass, field
+from dataclasses import dataclass, field
 from datetime import datetime
 
+_fromiso = datetime.fromisoformat
+_uuid4 = uuid.uuid4
 
-@dataclass
+
+def _new_id() -> str:
+    """生成新的订阅ID"""
+    return str(_uuid4())
+
+
+@dataclass(slots=True)
 class Target:
     """推送目标"""
 
@@ -15,7 +23,7 @@ class Target:
 
     def to_dict(self) -> dict:
         """转换为字典"""
-        return asdict(self)
+        return {"type": self.type, "platform": self.platform, "id": self.id}
 
     @classmethod
     def from_dict(cls, data: dict) -> "Target":
@@ -23,17 +31,19 @@ class Target:
         return cls(**data)
 
 
-@dataclass
+@dataclass(slots=True)
 class Subscription:
     """RSS订阅"""
 
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = field(default_factory=_new_id)
     name: str = ""
     url: str = ""
     enabled: bool = True
     targets: list[Target] = field(default_factory=list)
     last_pub_date: datetime | None = None  # 最后一条推送动态的真实发布时间 (基准线)
     last_error: str | None = None  # 最后一次运行错误信息
+    etag: str | None = None  # 最近一次响应的 ETag（条件请求）
+    last_modified: str | None = None  # 最近一次响应的 Last-Modified（条件请求）
 
     # 功能字段
     template: str | None = None
@@ -47,9 +57,13 @@ class Subscription:
             "name": self.name,
             "url": self.url,
             "enabled": self.enabled,
-            "targets": [t.to_dict() for t in self.targets],
+            "targets": [
+                {"type": t.type, "platform": t.platform, "id": t.id} for t in self.targets
+            ],
             "last_pub_date": self.last_pub_date.isoformat() if self.last_pub_date else None,
             "last_error": self.last_error,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
             "template": self.template,
             "filters": self.filters,
             "max_items": self.max_items,
@@ -63,16 +77,18 @@ class Subscription:
 
         last_pub_date = None
         if data.get("last_pub_date"):
-            last_pub_date = datetime.fromisoformat(data["last_pub_date"])
+            last_pub_date = _fromiso(data["last_pub_date"])
 
         return cls(
-            id=data.get("id", str(uuid.uuid4())),
+            id=data.get("id") or _new_id(),
             name=data.get("name", ""),
             url=data.get("url", ""),
             enabled=data.get("enabled", True),
             targets=targets,
             last_pub_date=last_pub_date,
             last_error=data.get("last_error"),
+            etag=data.get("etag"),
+            last_modified=data.get("last_modified"),
             template=data.get("template"),
             filters=data.get("filters", {}),
             max_items=data.get("max_items", 1),
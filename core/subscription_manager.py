@@ -12,6 +12,8 @@ class SubscriptionManager:
     def __init__(self, storage: Storage):
         self.storage = storage
         self.subscriptions: list[Subscription] = []
+        # 待写回存储的订阅（按ID去重），由 flush_dirty 一次性保存
+        self._dirty: dict[str, Subscription] = {}
         self.load()
 
     def load(self):
@@ -20,9 +22,13 @@ class SubscriptionManager:
         logger.info(f"订阅管理器加载了 {len(self.subscriptions)} 个订阅")
 
     def save(self):
-        """保存订阅"""
+        """保存全部订阅"""
         self.storage.save_subscriptions(self.subscriptions)
 
+    def save_one(self, sub: Subscription):
+        """只保存单个订阅"""
+        self.storage.upsert_subscription(sub)
+
     def add(self, name: str, url: str, targets: list[Target]) -> Subscription:
         """添加订阅
 
@@ -44,7 +50,7 @@ class SubscriptionManager:
         
         sub = Subscription(name=name, url=url, targets=targets)
         self.subscriptions.append(sub)
-        self.save()
+        self.save_one(sub)
         logger.info(f"添加订阅: {name} ({url})")
         return sub
 
@@ -63,7 +69,8 @@ class SubscriptionManager:
             return False
 
         self.subscriptions = [s for s in self.subscriptions if s.id != sub.id]
-        self.save()
+        self._dirty.pop(sub.id, None)
+        self.storage.delete_subscription(sub.id)
         logger.info(f"删除订阅: {sub.name} ({sub.id})")
         return True
 
@@ -132,7 +139,7 @@ class SubscriptionManager:
         sub = self.get(sub_id)
         if sub:
             sub.enabled = True
-            self.save()
+            self.save_one(sub)
             logger.info(f"启用订阅: {sub.name}")
             return True
         return False
@@ -149,7 +156,7 @@ class SubscriptionManager:
         sub = self.get(sub_id)
         if sub:
             sub.enabled = False
-            self.save()
+            self.save_one(sub)
             logger.info(f"禁用订阅: {sub.name}")
             return True
         return False
@@ -163,9 +170,30 @@ class SubscriptionManager:
         for i, s in enumerate(self.subscriptions):
             if s.id == sub.id:
                 self.subscriptions[i] = sub
-                self.save()
+                self.save_one(sub)
                 return
 
+    def mark_dirty(self, sub: Subscription):
+        """标记订阅信息已变更，延迟到 flush_dirty 时统一保存
+
+        Args:
+            sub: 订阅对象
+        """
+        self._dirty[sub.id] = sub
+
+    def flush_dirty(self):
+        """将所有已标记变更的订阅一次性写回存储"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        updated = []
+        for i, s in enumerate(self.subscriptions):
+            if s.id in dirty:
+                self.subscriptions[i] = dirty.pop(s.id)
+                updated.append(self.subscriptions[i])
+        # 期间已被删除的订阅不再写回
+        self.storage.upsert_subscriptions(updated)
+
     def add_target(self, sub_id: str, target: Target) -> bool:
         """为订阅添加推送目标
 
@@ -189,7 +217,7 @@ class SubscriptionManager:
                     return False
 
             sub.targets.append(target)
-            self.save()
+            self.save_one(sub)
             logger.info(f"为订阅 {sub.name} 添加推送目标")
             return True
         return False
@@ -211,7 +239,7 @@ class SubscriptionManager:
             # 1. 尝试精确匹配
             sub.targets = [t for t in sub.targets if t.id != target_id]
             if len(sub.targets) < original_len:
-                self.save()
+                self.save_one(sub)
                 logger.info(f"从订阅 {sub.name} 移除推送目标 (精确匹配: {target_id})")
                 return True
             
@@ -220,7 +248,7 @@ class SubscriptionManager:
             suffix = ":" + target_id
             sub.targets = [t for t in sub.targets if not t.id.endswith(suffix)]
             if len(sub.targets) < original_len:
-                self.save()
+                self.save_one(sub)
                 logger.info(f"从订阅 {sub.name} 移除推送目标 (后缀匹配: {target_id})")
                 return True
         return False
@@ -81,6 +81,7 @@ class RSSPushPlugin(star.Star):
         polling_config = self.plugin_config.get("polling", {})
         polling_enabled = polling_config.get("enabled", True)
         polling_interval = polling_config.get("interval", 30)
+        concurrent_subs = polling_config.get("concurrent_subs", 10)
         
         logger.info(f"读取配置: 轮询启用={polling_enabled}, 轮询间隔={polling_interval} 分钟")
 
@@ -91,6 +92,7 @@ class RSSPushPlugin(star.Star):
                 self.pusher,
                 self.storage,
                 polling_interval,
+                concurrent_subs,
             )
             await self.scheduler.start()
             logger.info(f"RSS调度器已启动，轮询间隔: {polling_interval} 分钟")
@@ -748,4 +750,7 @@ class RSSPushPlugin(star.Star):
         if self.fetcher:
             await self.fetcher.close()
 
+        # 关闭数据库连接
+        self.storage.close()
+
         logger.info("RSS推送插件已停止")
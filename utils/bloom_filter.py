@@ -0,0 +1,39 @@
+"""布隆过滤器模块 - 推送记录查重的内存快速路径"""
+
+import hashlib
+import math
+
+
+class BloomFilter:
+    """简单的布隆过滤器
+
+    判定"不存在"是确定的；判定"可能存在"时需要回查数据库确认
+    """
+
+    def __init__(self, capacity: int = 10000, error_rate: float = 0.001):
+        """初始化布隆过滤器
+
+        Args:
+            capacity: 预计容纳的元素数量
+            error_rate: 期望的误判率
+        """
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        """双重哈希生成 k 个比特位置"""
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str):
+        """添加元素"""
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
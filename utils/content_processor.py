@@ -8,6 +8,26 @@ import html
 
 from astrbot.api import logger
 
+# 预编译正则，避免每个条目重复编译
+_VIDEO_HREF_RE = re.compile(r'bilibili\.com/video')
+_OPUS_HREF_RE = re.compile(r'bilibili\.com/opus')
+_VIDEO_URL_RE = re.compile(r'https://www\.bilibili\.com/video/[A-Za-z0-9]+')
+_LINK_LABEL_RULES = [
+    (re.compile(r'\s*-\s*视频地址[：:]\s*', re.IGNORECASE), '\n🎬 视频地址：'),
+    (re.compile(r'\s*-\s*图文地址[：:]\s*', re.IGNORECASE), '\n📄 图文地址：'),
+    (re.compile(r'\s*-\s*直播间地址[：:]\s*', re.IGNORECASE), '\n🎙️ 直播间地址：'),
+    # 也处理没有破折号的情况
+    (re.compile(r'\s*视频地址[：:]\s*', re.IGNORECASE), '\n🎬 视频地址：'),
+    (re.compile(r'\s*图文地址[：:]\s*', re.IGNORECASE), '\n📄 图文地址：'),
+    (re.compile(r'\s*直播间地址[：:]\s*', re.IGNORECASE), '\n🎙️ 直播间地址：'),
+]
+_EDGE_QUOTES_RE = re.compile(r'^["\'"]+|["\'"]+$')
+_WHITESPACE_RE = re.compile(r'\s+')
+# 需要跳过的行：单独的破折号和"分享图片"
+_SKIP_LINES = frozenset(['-', '—', '–', '－', '分享图片'])
+# 空白规范化表：制表符转空格，回车统一为换行
+_WS_TABLE = str.maketrans({'\t': ' ', '\r': '\n'})
+
 
 class ContentProcessor(ABC):
     """内容处理器基类"""
@@ -79,17 +99,17 @@ class BilibiliProcessor(ContentProcessor):
         soup = BeautifulSoup(description, 'html.parser')
         
         # 1. 提取视频链接
-        video_links = soup.find_all('a', href=re.compile(r'bilibili\.com/video'))
+        video_links = soup.find_all('a', href=_VIDEO_HREF_RE)
         if video_links:
             result['video_url'] = video_links[0].get('href', '')
         else:
             # 尝试从纯文本中提取
-            video_match = re.search(r'https://www\.bilibili\.com/video/[A-Za-z0-9]+', description)
+            video_match = _VIDEO_URL_RE.search(description)
             if video_match:
                 result['video_url'] = video_match.group(0)
         
         # 2. 提取图文链接
-        opus_links = soup.find_all('a', href=re.compile(r'bilibili\.com/opus'))
+        opus_links = soup.find_all('a', href=_OPUS_HREF_RE)
         if opus_links:
             result['extra_links']['opus'] = opus_links[0].get('href', '')
 
@@ -98,47 +118,30 @@ class BilibiliProcessor(ContentProcessor):
         # 3. 处理纯文本（description已经被parser转换为纯文本）
         text = description
         
-        logger.info(f"[B站处理器] 原始description: {repr(text[:300])}")
+        logger.info("[B站处理器] 原始description: %r", text[:300])
         
         # 3.1 格式化各类链接地址（保留"XX地址："前缀，添加emoji和换行）
         # 格式：嗯嗯 - 视频地址： https://... → 嗯嗯\n🎬 视频地址：https://...
-        text = re.sub(r'\s*-\s*视频地址[：:]\s*', '\n🎬 视频地址：', text, flags=re.IGNORECASE)
-        text = re.sub(r'\s*-\s*图文地址[：:]\s*', '\n📄 图文地址：', text, flags=re.IGNORECASE)
-        text = re.sub(r'\s*-\s*直播间地址[：:]\s*', '\n🎙️ 直播间地址：', text, flags=re.IGNORECASE)
-        # 也处理没有破折号的情况
-        text = re.sub(r'\s*视频地址[：:]\s*', '\n🎬 视频地址：', text, flags=re.IGNORECASE)
-        text = re.sub(r'\s*图文地址[：:]\s*', '\n📄 图文地址：', text, flags=re.IGNORECASE)
-        text = re.sub(r'\s*直播间地址[：:]\s*', '\n🎙️ 直播间地址：', text, flags=re.IGNORECASE)
-        
-        logger.info(f"[B站处理器] 处理后text: {repr(text[:300])}")
-        
-        # 4. 分行处理
-        lines = text.split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            
-            # 跳过空行
-            if not line:
-                continue
-            
-            # 跳过单独的破折号
-            if line in ['-', '—', '–', '－']:
-                continue
-            
-            # 跳过"分享图片"
-            if line == '分享图片':
-                continue
-            
-            cleaned_lines.append(line)
+        # 只有包含"地址"字样时才需要执行替换
+        if '地址' in text:
+            for pattern, repl in _LINK_LABEL_RULES:
+                text = pattern.sub(repl, text)
+        
+        logger.info("[B站处理器] 处理后text: %r", text[:300])
+        
+        # 4. 分行处理：一次遍历完成去空白、跳过空行/破折号/"分享图片"
+        cleaned_lines = [
+            line
+            for line in (raw.strip() for raw in text.translate(_WS_TABLE).split('\n'))
+            if line and line not in _SKIP_LINES
+        ]
         
         # 5. 组合描述文本
         if cleaned_lines:
             clean_desc = '\n'.join(cleaned_lines)
             
             # 移除开头和结尾的引号
-            clean_desc = re.sub(r'^["\'"]+|["\'"]+$', '', clean_desc).strip()
+            clean_desc = _EDGE_QUOTES_RE.sub('', clean_desc).strip()
             
             # 截断处理
             max_len = config.get('push', {}).get('max_description_length', 200)
@@ -154,7 +157,7 @@ class BilibiliProcessor(ContentProcessor):
             if len(clean_desc) >= 2:
                 result['clean_description'] = clean_desc
         
-        logger.debug(f"B站内容处理结果: {result}")
+        logger.debug("B站内容处理结果: %s", result)
         return result
 
 
@@ -188,10 +191,10 @@ class DefaultProcessor(ContentProcessor):
         clean_text = html.unescape(clean_text)
         
         # 清理空白
-        clean_text = re.sub(r'\s+', ' ', clean_text).strip()
+        clean_text = _WHITESPACE_RE.sub(' ', clean_text).strip()
         
         # 移除引号
-        clean_text = re.sub(r'^["\'"]+|["\'"]+$', '', clean_text).strip()
+        clean_text = _EDGE_QUOTES_RE.sub('', clean_text).strip()
         
         # 截断
         max_len = config.get('push', {}).get('max_description_length', 200)
@@ -229,7 +232,7 @@ class ContentProcessorFactory:
         """
         for processor in self.processors:
             if processor.match(url):
-                logger.debug(f"使用处理器: {processor.__class__.__name__}")
+                logger.debug("使用处理器: %s", processor.__class__.__name__)
                 return processor
         
         # 理论上不会到这里,因为DefaultProcessor总是匹配
@@ -2,12 +2,50 @@
 
 import html
 import re
+import string
 from datetime import datetime
+from functools import lru_cache
 
 from bs4 import BeautifulSoup
 
 from astrbot.api import logger
 
+# 仅包含单个emoji的行（说明模板变量为空）
+_EMOJI_ONLY_LINE_RE = re.compile(r'^[\U0001F300-\U0001F9FF]\s*$')
+
+
+@lru_cache(maxsize=64)
+def _compile_template(template: str) -> tuple[tuple[str, ...], tuple[str, ...]] | None:
+    """将模板预解析为字面量片段和字段名
+
+    Args:
+        template: 消息模板
+
+    Returns:
+        (literals, fields)，渲染时交替拼接；模板包含格式说明、转换符或
+        属性/索引访问时返回None，由 str.format 处理
+    """
+    literals = []
+    fields = []
+    try:
+        for literal, field_name, format_spec, conversion in string.Formatter().parse(template):
+            if len(literals) > len(fields):
+                # 连续的字面量片段合并（如转义的 {{ }}）
+                literals[-1] += literal
+            else:
+                literals.append(literal)
+            if field_name is None:
+                continue
+            if format_spec or conversion or not field_name.isidentifier():
+                return None
+            fields.append(field_name)
+    except ValueError:
+        return None
+
+    if len(literals) == len(fields):
+        literals.append("")
+    return tuple(literals), tuple(fields)
+
 
 class MessageFormatter:
     """消息格式化器"""
@@ -19,6 +57,20 @@ class MessageFormatter:
             template: 消息模板
         """
         self.template = template
+        self._compiled = _compile_template(template)
+
+    def _render(self, params: dict) -> str:
+        """渲染模板，缺少变量时抛出KeyError"""
+        if self._compiled is None:
+            return self.template.format(**params)
+
+        literals, fields = self._compiled
+        parts = [literals[0]]
+        for i, name in enumerate(fields):
+            value = params[name]
+            parts.append(value if isinstance(value, str) else format(value))
+            parts.append(literals[i + 1])
+        return "".join(parts)
 
     def format(self, sub_name: str, item: dict) -> str:
         """使用模板格式化消息
@@ -43,7 +95,7 @@ class MessageFormatter:
                 params["pubDate"] = self._format_date(params["pubDate"])
 
             # 格式化模板
-            message = self.template.format(**params)
+            message = self._render(params)
             
             # 后处理：清理包含空值的行
             lines = message.split('\n')
@@ -57,7 +109,7 @@ class MessageFormatter:
                 
                 # 检查是否包含emoji后面紧跟空白（说明变量是空的）
                 # 例如: "🎬 " 或 "🎬  " 或 "🎬"
-                if re.match(r'^[\U0001F300-\U0001F9FF]\s*$', line.strip()):
+                if _EMOJI_ONLY_LINE_RE.match(line.strip()):
                     continue  # 跳过这一行
                 
                 cleaned_lines.append(line)
@@ -2,6 +2,8 @@
 
 import html
 from datetime import datetime
+from operator import itemgetter
+from urllib.parse import urlparse, urlunparse
 
 from bs4 import BeautifulSoup
 from dateutil import parser as date_parser
@@ -13,18 +15,34 @@ class RSSParser:
     """RSS内容解析器"""
 
     @staticmethod
-    def parse_entries(feed_data: dict) -> list[dict]:
+    def parse_entries(
+        feed_data: dict, since: datetime | None = None, latest_only: bool = False
+    ) -> list[dict]:
         """解析RSS条目
 
+        先只解析发布时间筛选条目，描述和图片等开销较大的字段只对保留的条目提取
+
         Args:
             feed_data: feedparser解析的feed数据
+            since: 只保留发布时间晚于该时间的条目（同时跳过没有发布时间的条目）
+            latest_only: 只保留发布时间最新的一条
 
         Returns:
             解析后的条目列表
         """
-        entries = []
-
+        selected = []
         for entry in feed_data.get("entries", []):
+            pub_date = RSSParser._parse_date(entry)
+            if since is not None and (pub_date is None or pub_date <= since):
+                continue
+            selected.append((entry, pub_date))
+
+        if latest_only:
+            dated = [item for item in selected if item[1] is not None]
+            selected = [max(dated, key=itemgetter(1))] if dated else []
+
+        entries = []
+        for entry, pub_date in selected:
             try:
                 parsed = {
                     "guid": RSSParser._extract_guid(entry),
@@ -32,7 +50,7 @@ class RSSParser:
                     "link": entry.get("link", ""),
                     "description": RSSParser._extract_description(entry),
                     "author": entry.get("author", ""),
-                    "pubDate": RSSParser._parse_date(entry),
+                    "pubDate": pub_date,
                     "images": RSSParser._extract_images(entry),
                 }
                 entries.append(parsed)
@@ -40,14 +58,12 @@ class RSSParser:
                 logger.error(f"解析RSS条目失败: {e}")
                 continue
 
-        logger.info(f"解析了 {len(entries)} 个RSS条目")
+        logger.info("解析了 %d 个RSS条目", len(entries))
         return entries
 
     @staticmethod
     def _extract_guid(entry: dict) -> str:
         """提取条目唯一标识"""
-        from urllib.parse import urlparse, urlunparse
-        
         # 优先使用id，其次使用guid
         guid = entry.get("id") or entry.get("guid")
         if guid:
@@ -126,11 +142,11 @@ class RSSParser:
                 if dt.tzinfo is not None:
                     local_tz = tz.tzlocal()
                     dt = dt.astimezone(local_tz).replace(tzinfo=None)
-                    logger.debug(f"时间已转换为本地时区: {dt}")
+                    logger.debug("时间已转换为本地时区: %s", dt)
                 
                 return dt
             except Exception as e:
-                logger.debug(f"解析日期失败 {date_str}: {e}")
+                logger.debug("解析日期失败 %s: %s", date_str, e)
 
         return None
 
@@ -179,7 +195,7 @@ class RSSParser:
                     if poster and isinstance(poster, str) and poster.startswith("http") and poster not in images:
                         images.append(poster)
             except Exception as e:
-                logger.debug(f"从summary提取图片失败: {e}")
+                logger.debug("从summary提取图片失败: %s", e)
 
         # 4. 从 content 中提取
         if "content" in entry:
@@ -204,10 +220,10 @@ class RSSParser:
                             ):
                                 images.append(poster)
                     except Exception as e:
-                        logger.debug(f"从content提取图片失败: {e}")
+                        logger.debug("从content提取图片失败: %s", e)
 
         if images:
-            logger.debug(f"提取到 {len(images)} 张图片")
+            logger.debug("提取到 %d 张图片", len(images))
 
         return images
 
@@ -0,0 +1,82 @@
+"""时钟偏差滤波模块 - 估计本地时钟相对网络时间的偏差与漂移"""
+
+
+class TimeFilter:
+    """二维卡尔曼滤波器，状态为 (偏差, 漂移率)
+
+    偏差单位为秒（网络时间 - 本地时间），漂移率单位为 秒/秒。
+    两次同步之间按漂移率外推偏差，以补偿本地晶振的频率误差。
+    """
+
+    # 漂移率上限（500 ppm），防止异常测量把外推带偏
+    MAX_DRIFT = 500e-6
+
+    def __init__(self, offset_noise: float = 1e-6, drift_noise: float = 1e-14):
+        """初始化滤波器
+
+        Args:
+            offset_noise: 偏差的过程噪声（秒²/秒）
+            drift_noise: 漂移率的过程噪声（(秒/秒)²/秒）
+        """
+        self.offset_noise = offset_noise
+        self.drift_noise = drift_noise
+        self.offset = 0.0
+        self.drift = 0.0
+        self._t = None  # 状态对应的本地时间戳
+        self._p = [[0.0, 0.0], [0.0, 0.0]]  # 协方差矩阵
+
+    @property
+    def ready(self) -> bool:
+        """是否已有测量值"""
+        return self._t is not None
+
+    def _predict(self, t: float):
+        """将状态外推到本地时间 t"""
+        dt = t - self._t
+        if dt <= 0:
+            return
+        (p00, p01), (p10, p11) = self._p
+        self.offset += self.drift * dt
+        # P = F P F^T + Q，F = [[1, dt], [0, 1]]
+        p00 = p00 + dt * (p10 + p01) + dt * dt * p11 + self.offset_noise * dt
+        p01 = p01 + dt * p11
+        p10 = p10 + dt * p11
+        p11 = p11 + self.drift_noise * dt
+        self._p = [[p00, p01], [p10, p11]]
+        self._t = t
+
+    def update(self, offset: float, max_error: float, t_local: float):
+        """加入一次偏差测量
+
+        Args:
+            offset: 测得的偏差（秒）
+            max_error: 测量误差上限（秒），如 SNTP 往返时延的一半
+            t_local: 测量时的本地时间戳
+        """
+        r = max(max_error, 1e-3) ** 2
+        if self._t is None:
+            self.offset = offset
+            self.drift = 0.0
+            self._p = [[r, 0.0], [0.0, self.MAX_DRIFT ** 2]]
+            self._t = t_local
+            return
+
+        self._predict(t_local)
+        (p00, p01), (p10, p11) = self._p
+        residual = offset - self.offset
+        s = p00 + r
+        k0, k1 = p00 / s, p10 / s
+        self.offset += k0 * residual
+        self.drift += k1 * residual
+        self.drift = max(-self.MAX_DRIFT, min(self.MAX_DRIFT, self.drift))
+        # P = (I - K H) P，H = [1, 0]
+        self._p = [
+            [(1 - k0) * p00, (1 - k0) * p01],
+            [p10 - k1 * p00, p11 - k1 * p01],
+        ]
+
+    def offset_at(self, t_local: float) -> float:
+        """估计本地时间 t_local 时的偏差（秒）"""
+        if self._t is None:
+            return 0.0
+        return self.offset + self.drift * (t_local - self._t)